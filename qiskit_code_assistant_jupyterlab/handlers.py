@@ -14,36 +14,288 @@
 # limitations under the License.
 #
 
+import asyncio
+import atexit
+import functools
+import hashlib
+import http.cookiejar
 import json
+import logging
 import os
-from datetime import datetime
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Optional
+from urllib.parse import urlsplit
 
 import requests
 import tornado
 from jupyter_server.base.handlers import APIHandler
 from jupyter_server.utils import url_path_join
 from qiskit_ibm_runtime import QiskitRuntimeService
+from requests.adapters import HTTPAdapter
+from tornado.ioloop import IOLoop
+from urllib3.exceptions import ReadTimeoutError
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+except ImportError:
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj, separators=(",", ":")).encode()
+
+    _loads = json.loads
+
+logger = logging.getLogger(__name__)
 
 OPENAI_VERSION = "v1"
 QCA_API_VERSION = "v1"
 STREAM_DATA_PREFIX = "data: "
+_STREAM_DATA_PREFIX_BYTES = STREAM_DATA_PREFIX.encode()
+_STREAM_DATA_PREFIX_LEN = len(_STREAM_DATA_PREFIX_BYTES)
+_STREAM_DONE_PAYLOAD = b"[DONE]"
+MODELS_CACHE_TTL = 60  # seconds
+UPSTREAM_TIMEOUT = (3.05, 30)  # (connect, read) seconds
+# Non-streaming prompts and migrations send nothing until generation is done
+GENERATION_TIMEOUT = (3.05, 300)  # (connect, read) seconds
+UPSTREAM_POOL_SIZE = 20  # pooled connections per host, and worker threads making calls
+BREAKER_FAILURE_THRESHOLD = 5  # consecutive connection failures before opening
+BREAKER_OPEN_SECONDS = 30
+PROBE_CACHE_TTL = 300  # seconds a service type probe result is reused
+PREFS_FLUSH_DELAY = 0.1  # seconds preference updates are batched before writing
+STREAM_FLUSH_DELAY = 0.008  # seconds streamed events are coalesced before flushing
+_UTC = timezone.utc
+
+# Constant response bodies, serialized once
+_ACCEPTED_TRUE = _dumps({"accepted": "true"})
+_SUCCESS_TRUE = _dumps({"success": "true"})
+_FEEDBACK_UNSUPPORTED = _dumps({"message": "Feedback not supported for this service"})
+
+
+@dataclass(frozen=True)
+class RuntimeConfig:
+    """Immutable snapshot of the runtime settings.
+
+    Handlers read one snapshot for the whole request and writers publish a
+    new one through _atomic_swap(), so concurrent requests never see a
+    half-applied change: POST /service, for instance, publishes the new
+    service_url only together with its probed is_openai value.
+    """
+
+    service_url: str = "http://localhost"
+    api_token: Optional[str] = ""
+    is_openai: bool = False
+    selected_credential: Optional[str] = None
+    using_env_var: bool = False  # Track if env var is overriding selection
+
+    @functools.cached_property
+    def header(self) -> dict:
+        header = {
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+            "X-Caller": "qiskit-code-assistant-jupyterlab",
+        }
+        if not self.is_openai:
+            header["Authorization"] = f"Bearer {self.api_token}"
+        return header
+
+    @functools.cached_property
+    def token_digest(self) -> str:
+        """Short hash of the API token, for keying cached responses without holding the token."""
+        return hashlib.blake2b((self.api_token or "").encode(), digest_size=8).hexdigest()
+
+
+runtime_configs = RuntimeConfig()
+_runtime_configs_lock = threading.Lock()
+
+
+def _atomic_swap(**changes) -> RuntimeConfig:
+    """Publish a copy of the current runtime config with changes applied."""
+    global runtime_configs
+    with _runtime_configs_lock:
+        runtime_configs = replace(runtime_configs, **changes)
+        return runtime_configs
+
+
+# Shared session so upstream calls reuse pooled keep-alive connections
+# instead of paying a TCP + TLS handshake on every request
+_SESSION = requests.Session()
+# Refuse all cookies: a Set-Cookie from one account must not be replayed on
+# calls made after the token or credential is switched
+_SESSION.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=UPSTREAM_POOL_SIZE,
+    max_retries=Retry(
+        total=3,
+        # Failed connects never reached the server, so they are safe to retry for
+        # any method; read errors and retryable statuses are only retried for the
+        # idempotent methods, so a prompt or feedback POST is never sent twice
+        connect=2,
+        read=1,
+        allowed_methods=Retry.DEFAULT_ALLOWED_METHODS,
+        backoff_factor=0.3,
+        status_forcelist=(502, 503, 504),
+        # urllib3 would sleep for the full Retry-After with no upper bound while
+        # holding a worker; the backoff above keeps retries to a few seconds
+        respect_retry_after_header=False,
+        # Hand the last response back so raise_for_status() maps it as before
+        raise_on_status=False,
+    ),
+)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+atexit.register(_SESSION.close)
+
+# Dedicated workers for blocking session calls, sized to the connection pool so
+# upstream latency cannot starve the IOLoop's default executor
+_EXECUTOR = ThreadPoolExecutor(max_workers=UPSTREAM_POOL_SIZE, thread_name_prefix="qca-upstream")
+
+
+# Serialized upstream GET responses keyed by (service_url, is_openai, kind, id).
+# Each entry keeps the upstream validators so stale entries can be
+# revalidated with a conditional GET instead of a full download.
+_RESPONSE_CACHE = {}
+
+
+def response_cache_key(config, kind, id=None):
+    # Responses can depend on the caller's entitlements, so they are keyed per token
+    return (config.service_url, config.is_openai, config.token_digest, kind, id)
+
+
+def get_fresh_cached_response(key, ttl=MODELS_CACHE_TTL):
+    """Return the cached body if it was stored or revalidated less than ttl seconds ago."""
+    entry = _RESPONSE_CACHE.get(key)
+    if entry and time.monotonic() - entry["time"] < ttl:
+        return entry["body"]
+    return None
+
+
+def get_conditional_header(config, key):
+    """Request headers, plus If-None-Match/If-Modified-Since when a cached copy exists.
+
+    Returns (header, entry). Hold on to the entry and pass it to
+    revalidate_cached_response() on a 304, as the cache may be cleared meanwhile.
+    """
+    header = dict(get_header(config))
+    entry = _RESPONSE_CACHE.get(key)
+    if entry and (entry["etag"] or entry["last_modified"]):
+        if entry["etag"]:
+            header["If-None-Match"] = entry["etag"]
+        if entry["last_modified"]:
+            header["If-Modified-Since"] = entry["last_modified"]
+        return header, entry
+    return header, None
+
+
+def store_cached_response(key, body, upstream_headers):
+    _RESPONSE_CACHE[key] = {
+        "time": time.monotonic(),
+        "etag": upstream_headers.get("ETag"),
+        "last_modified": upstream_headers.get("Last-Modified"),
+        "body": body,
+    }
+
+
+def revalidate_cached_response(key, entry):
+    """Return the body of the entry the conditional request was built from after a 304.
+
+    The entry is only marked fresh if it is still the cached one; if it was
+    dropped or replaced while the request was in flight it stays that way.
+    """
+    if _RESPONSE_CACHE.get(key) is entry:
+        entry["time"] = time.monotonic()
+    return entry["body"]
+
+
+def clear_response_cache():
+    _RESPONSE_CACHE.clear()
+
+
+@functools.lru_cache(maxsize=512)
+def _join(base, *parts):
+    """url_path_join memoized per (service_url, path) pair."""
+    return url_path_join(base, *parts)
+
+
+# Per-host circuit breaker state: {netloc: {"failures": int, "open_until": float}}
+_BREAKERS = {}
+
+
+def _is_read_timeout(error: requests.exceptions.RequestException) -> bool:
+    """Whether error is a read timeout that requests reports as ConnectionError.
+
+    Once the urllib3 read retries are used up, requests wraps the resulting
+    MaxRetryError(reason=ReadTimeoutError) in a ConnectionError.
+    """
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, ReadTimeoutError)
 
-runtime_configs = {
-    "service_url": "http://localhost",
-    "api_token": "",
-    "is_openai": False,
-    "selected_credential": None,
-    "using_env_var": False,  # Track if env var is overriding selection
-}
+
+async def _request(method: str, url: str, **kwargs) -> requests.Response:
+    """Run a session call on a worker thread so the IOLoop is free during upstream I/O.
+
+    Calls are bounded by UPSTREAM_TIMEOUT unless a timeout is passed. After
+    BREAKER_FAILURE_THRESHOLD consecutive connection failures to a host, calls to
+    it fail fast with a 503 for BREAKER_OPEN_SECONDS instead of tying up a worker
+    each time. Read timeouts are not counted: a slow generation says nothing
+    about whether the host is reachable.
+    """
+    host = urlsplit(url).netloc
+    breaker = _BREAKERS.setdefault(host, {"failures": 0, "open_until": 0.0})
+    if time.monotonic() < breaker["open_until"]:
+        raise tornado.web.HTTPError(503, f"Upstream service {host} is unavailable")
+
+    kwargs.setdefault("timeout", UPSTREAM_TIMEOUT)
+    try:
+        r = await IOLoop.current().run_in_executor(
+            _EXECUTOR, functools.partial(_SESSION.request, method, url, **kwargs)
+        )
+    except (requests.exceptions.ConnectionError, requests.exceptions.ConnectTimeout) as e:
+        if not _is_read_timeout(e):
+            breaker["failures"] += 1
+            if breaker["failures"] >= BREAKER_FAILURE_THRESHOLD:
+                breaker["failures"] = 0
+                breaker["open_until"] = time.monotonic() + BREAKER_OPEN_SECONDS
+        raise
+
+    breaker["failures"] = 0
+    return r
+
+
+# Upstream GETs in flight, so concurrent identical requests can share one call
+_INFLIGHT = {}
+
+
+async def _coalesced_get(url: str, headers: dict) -> requests.Response:
+    """GET url through _request, joining an identical GET that is already in flight.
+
+    The shared Response is only read by callers, never modified.
+    """
+    key = (url, frozenset(headers.items()))
+    future = _INFLIGHT.get(key)
+    if future is None:
+        future = asyncio.ensure_future(_request("GET", url, headers=headers))
+        _INFLIGHT[key] = future
+        future.add_done_callback(lambda _: _INFLIGHT.pop(key, None))
+    # A caller that goes away must not cancel the call for the others
+    return await asyncio.shield(future)
 
 
 def update_token(token):
     if token:
-        runtime_configs["api_token"] = token
         # When manually setting token, update selected credential to match
-        runtime_configs["selected_credential"] = "qiskit-code-assistant"
+        _atomic_swap(api_token=token, selected_credential="qiskit-code-assistant")
         # Save to both qiskit-ibm.json and preferences
         try:
             QiskitRuntimeService.save_account(
@@ -53,9 +305,9 @@ def update_token(token):
                 overwrite=True,
             )
             save_selected_credential("qiskit-code-assistant")
-            print("Manually entered token saved as 'qiskit-code-assistant' credential")
+            logger.info("Manually entered token saved as 'qiskit-code-assistant' credential")
         except Exception as e:
-            print(f"Error saving token: {e}")
+            logger.error("Error saving token: %s", e)
             # Still keep the token in runtime_configs so it can be used this session
             # Even if saving to file fails
 
@@ -65,20 +317,45 @@ def get_preference_file_path():
     return Path.home() / ".qiskit" / "qiskit-code-assistant-prefs.json"
 
 
+# Parsed preference file, reused while its mtime is unchanged
+_PREFS_CACHE = {"mtime": None, "prefs": {}}
+# Preference updates not yet written to disk, and the timer that will write them
+_PENDING_PREFS = {}
+_PREFS_FLUSH = {"handle": None}
+
+
 def load_preferences():
-    """Load all preferences from preference file."""
+    """Load all preferences, including updates not yet flushed. The result must not be mutated."""
+    prefs = _load_preference_file()
+    if _PENDING_PREFS:
+        prefs = {**prefs, **_PENDING_PREFS}
+    return prefs
+
+
+def _load_preference_file():
     pref_file = get_preference_file_path()
-    if not os.path.exists(pref_file):
-        return {}
+    try:
+        mtime = os.stat(pref_file).st_mtime_ns
+    except FileNotFoundError:
+        # Keep returning the same empty dict while there is no file
+        if _PREFS_CACHE["mtime"] is not None:
+            _PREFS_CACHE.update(mtime=None, prefs={})
+        return _PREFS_CACHE["prefs"]
+
+    if _PREFS_CACHE["mtime"] == mtime:
+        return _PREFS_CACHE["prefs"]
 
     try:
         with open(pref_file) as f:
             prefs = json.load(f)
-        return prefs
     except (json.JSONDecodeError, IOError) as e:
-        print(f"Error reading preference file: {e}")
+        logger.warning("Error reading preference file: %s", e)
         return {}
 
+    _PREFS_CACHE["prefs"] = prefs
+    _PREFS_CACHE["mtime"] = mtime
+    return prefs
+
 
 def load_selected_credential():
     """Load the previously selected credential from preference file."""
@@ -87,26 +364,55 @@ def load_selected_credential():
 
 
 def save_preferences(updates):
-    """Save preferences to file. updates is a dict of key-value pairs to update."""
+    """Queue preference updates; they are written together after PREFS_FLUSH_DELAY."""
+    _PENDING_PREFS.update(updates)
+    if _PREFS_FLUSH["handle"] is not None:
+        return
+
+    io_loop = IOLoop.current(instance=False)
+    if io_loop is None:
+        flush_preferences()
+    else:
+        _PREFS_FLUSH["handle"] = io_loop.call_later(PREFS_FLUSH_DELAY, flush_preferences)
+
+
+def discard_pending_preferences():
+    """Drop queued preference updates without writing them."""
+    _PENDING_PREFS.clear()
+    handle = _PREFS_FLUSH["handle"]
+    if handle is not None:
+        IOLoop.current().remove_timeout(handle)
+        _PREFS_FLUSH["handle"] = None
+
+
+def flush_preferences():
+    """Write queued preference updates to the preference file in one go."""
+    _PREFS_FLUSH["handle"] = None
+    if not _PENDING_PREFS:
+        return
+    updates = dict(_PENDING_PREFS)
+    _PENDING_PREFS.clear()
+
     pref_file = get_preference_file_path()
 
     # Ensure .qiskit directory exists
     pref_file.parent.mkdir(parents=True, exist_ok=True)
 
     try:
-        # Load existing preferences
-        prefs = load_preferences()
-
-        # Update with new values
-        prefs.update(updates)
+        # Merge new values into the existing preferences
+        prefs = {**_load_preference_file(), **updates}
 
         # Save back to file
         with open(pref_file, "w") as f:
             json.dump(prefs, f, indent=2)
 
-        print(f"Saved preferences: {updates}")
+        # Keep the cache in step with what was just written
+        _PREFS_CACHE["prefs"] = prefs
+        _PREFS_CACHE["mtime"] = os.stat(pref_file).st_mtime_ns
+
+        logger.debug("Saved preferences: %s", updates)
     except IOError as e:
-        print(f"Error saving preference file: {e}")
+        logger.error("Error saving preference file: %s", e)
 
 
 def save_selected_credential(credential_name):
@@ -114,9 +420,10 @@ def save_selected_credential(credential_name):
     save_preferences({"selected_credential": credential_name})
 
 
-def get_never_prompt_flag():
-    """Get the global 'never prompt' flag."""
-    prefs = load_preferences()
+def get_never_prompt_flag(prefs=None):
+    """Get the global 'never prompt' flag, from prefs if already loaded."""
+    if prefs is None:
+        prefs = load_preferences()
     return prefs.get("never_prompt_credential_selection", False)
 
 
@@ -125,9 +432,10 @@ def set_never_prompt_flag(value):
     save_preferences({"never_prompt_credential_selection": value})
 
 
-def get_has_prompted_flag():
-    """Get the 'has prompted in this session' flag."""
-    prefs = load_preferences()
+def get_has_prompted_flag(prefs=None):
+    """Get the 'has prompted in this session' flag, from prefs if already loaded."""
+    if prefs is None:
+        prefs = load_preferences()
     return prefs.get("has_prompted_credential_selection", False)
 
 
@@ -136,6 +444,28 @@ def set_has_prompted_flag(value):
     save_preferences({"has_prompted_credential_selection": value})
 
 
+# Parsed qiskit-ibm.json, reused while the file's (path, mtime) is unchanged
+_QISKIT_JSON_CACHE = {"key": None, "config": {}}
+# Credentials filtered from the parsed config above, reused until it is re-parsed
+_CREDENTIALS_CACHE = {"config": None, "credentials": {}}
+
+
+def load_qiskit_config(path):
+    """Load qiskit-ibm.json, only re-parsing it when the file has changed on disk."""
+    try:
+        key = (path, path.stat().st_mtime_ns)
+    except FileNotFoundError:
+        # Keep returning the same empty dict while there is no file
+        if _QISKIT_JSON_CACHE["key"] is not None:
+            _QISKIT_JSON_CACHE.update(key=None, config={})
+        return _QISKIT_JSON_CACHE["config"]
+
+    if _QISKIT_JSON_CACHE["key"] != key:
+        _QISKIT_JSON_CACHE["config"] = _loads(path.read_bytes())
+        _QISKIT_JSON_CACHE["key"] = key
+    return _QISKIT_JSON_CACHE["config"]
+
+
 def get_credentials_from_config():
     """
     Read all credentials from qiskit-ibm.json file.
@@ -149,50 +479,51 @@ def get_credentials_from_config():
     - "my-work-account"
     - "personal-account"
     Or any other custom name they choose.
+
+    The returned dict is shared between calls and must not be mutated.
     """
     path = Path.home() / ".qiskit" / "qiskit-ibm.json"
 
-    if not os.path.exists(path):
-        return {}
-
     try:
-        with open(path) as f:
-            config = json.load(f)
-
-        # Filter out entries that have tokens
-        # This returns ALL credential entries regardless of their names
-        # Only include credentials with non-empty tokens
-        credentials = {
-            name: data for name, data in config.items()
-            if isinstance(data, dict) and data.get("token", "").strip()
-        }
-        return credentials
+        config = load_qiskit_config(path)
+
+        if _CREDENTIALS_CACHE["config"] is not config:
+            # Filter out entries that have tokens
+            # This returns ALL credential entries regardless of their names
+            # Only include credentials with non-empty tokens
+            _CREDENTIALS_CACHE["credentials"] = {
+                name: data for name, data in config.items()
+                if isinstance(data, dict) and data.get("token", "").strip()
+            }
+            _CREDENTIALS_CACHE["config"] = config
+        return _CREDENTIALS_CACHE["credentials"]
     except (json.JSONDecodeError, IOError) as e:
-        print(f"Error reading credentials file: {e}")
+        logger.warning("Error reading credentials file: %s", e)
         return {}
 
 
 def init_token():
     token = os.environ.get("QISKIT_IBM_TOKEN")
+    selected_credential = runtime_configs.selected_credential
 
     if token:
         # Environment variable takes precedence
-        runtime_configs["using_env_var"] = True
-        print("Using token from QISKIT_IBM_TOKEN environment variable")
+        using_env_var = True
+        logger.info("Using token from QISKIT_IBM_TOKEN environment variable")
     else:
-        runtime_configs["using_env_var"] = False
+        using_env_var = False
         credentials = get_credentials_from_config()
 
         # Try to restore previously selected credential from preferences
-        if not runtime_configs["selected_credential"]:
+        if not selected_credential:
             saved_credential = load_selected_credential()
             if saved_credential and saved_credential in credentials:
-                runtime_configs["selected_credential"] = saved_credential
-                print(f"Restored previously selected credential: {saved_credential}")
+                selected_credential = saved_credential
+                logger.info("Restored previously selected credential: %s", saved_credential)
 
         # If a specific credential is selected, use it
-        if runtime_configs["selected_credential"] and runtime_configs["selected_credential"] in credentials:
-            token = credentials[runtime_configs["selected_credential"]].get("token")
+        if selected_credential and selected_credential in credentials:
+            token = credentials[selected_credential].get("token")
         else:
             # Only auto-select if there's exactly one credential
             # If multiple credentials exist, leave token empty so frontend can prompt user
@@ -200,181 +531,375 @@ def init_token():
                 # Auto-select the only credential
                 single_cred_name = next(iter(credentials.keys()))
                 token = credentials[single_cred_name].get("token")
-                runtime_configs["selected_credential"] = single_cred_name
-                print(f"Auto-selected single credential: {single_cred_name}")
+                selected_credential = single_cred_name
+                logger.info("Auto-selected single credential: %s", single_cred_name)
             elif len(credentials) > 1:
                 # Multiple credentials exist - don't auto-select, let frontend prompt user
-                print(f"Found {len(credentials)} credentials, waiting for user selection")
+                logger.info("Found %d credentials, waiting for user selection", len(credentials))
                 token = None
             else:
                 # No credentials
-                print("No credentials found in qiskit-ibm.json")
+                logger.info("No credentials found in qiskit-ibm.json")
                 token = None
 
-    runtime_configs["api_token"] = token
+    _atomic_swap(
+        api_token=token,
+        selected_credential=selected_credential,
+        using_env_var=using_env_var,
+    )
 
 
-def get_header():
-    header = {
-        "Accept": "application/json",
-        "Content-Type": "application/json",
-        "X-Caller": "qiskit-code-assistant-jupyterlab",
-    }
-    if not runtime_configs["is_openai"]:
-        header["Authorization"] = f"Bearer {runtime_configs['api_token']}"
-    return header
+atexit.register(flush_preferences)
 
+# Credentials are resolved on first use rather than at extension load
+_token_initialized = False
+_token_init_lock = threading.Lock()
 
-def transform_model(model, is_openai):
-    return {
-        "_id": model["id"],
+
+def _ensure_token():
+    """Run init_token() once, the first time a handler needs the API token."""
+    global _token_initialized
+    if _token_initialized:
+        return
+    with _token_init_lock:
+        if not _token_initialized:
+            init_token()
+            _token_initialized = True
+
+
+def get_header(config: Optional[RuntimeConfig] = None) -> dict:
+    """Shared upstream request headers. Callers must copy before adding to them."""
+    if config is None:
+        config = runtime_configs
+    return config.header
+
+
+# Fields shared by every transformed model, keyed by is_openai. The nested
+# dicts are shared too, which is fine as results are only serialized.
+_MODEL_TEMPLATES = {
+    is_openai: {
         "disclaimer": {"accepted": is_openai},
-        "display_name": model["id"],
         "doc_link": "",
         "license": {"name": "", "link": ""},
-        "model_id": model["id"],
         "prompt_type": 1,
         "token_limit": 255
     }
+    for is_openai in (False, True)
+}
+
+
+def transform_model(model, is_openai):
+    model_id = model["id"]
+    return {
+        **_MODEL_TEMPLATES[is_openai],
+        "_id": model_id,
+        "display_name": model_id,
+        "model_id": model_id,
+    }
+
+
+def upstream_error_body(response: requests.Response) -> bytes:
+    """Body to send for an upstream error: forwarded as-is if it is JSON, else a generic error."""
+    try:
+        _loads(response.content)
+    except ValueError:
+        # e.g. an HTML error page from a proxy in front of the service
+        return _dumps({"error": "Request failed", "status": response.status_code})
+    return response.content
+
+
+_ID_RE = re.compile(r"\A[\w\-.:]{1,128}\Z")
+_BAD_ID = _dumps({"error": "bad id"})
+
+
+def validate_id(method):
+    """Reject malformed or oversized ids with a 400 before any upstream call is made.
+
+    Routes without an id leave it as None, which is passed through.
+    """
+    @functools.wraps(method)
+    async def wrapper(self, id=None, *args, **kwargs):
+        if id is not None and not _ID_RE.match(id):
+            self.set_status(400)
+            self.finish(_BAD_ID)
+            return
+        return await method(self, id, *args, **kwargs)
+    return wrapper
+
+
+# Service URL -> (monotonic time, is_openai) of its last successful probe
+_PROBE_RESULTS = {}
+
+
+async def _probe_is_openai(service_url) -> Optional[bool]:
+    """Check whether service_url is a Qiskit Code Assistant or an OpenAI-compatible API.
+
+    Returns None when the service cannot be reached.
+    """
+    try:
+        r = await _request("GET", url_path_join(service_url), headers=get_header())
+    except Exception as e:
+        logger.warning("Error probing service URL %s: %s", service_url, e)
+        return None
+
+    try:
+        is_openai = (_loads(r.content)["name"] != "qiskit-code-assistant")
+    except (ValueError, KeyError, TypeError):
+        is_openai = True
+    else:
+        # Only a successful, well-formed answer is worth remembering; an error
+        # page falls back to is_openai for this request alone
+        if r.ok:
+            _PROBE_RESULTS[service_url] = (time.monotonic(), is_openai)
+    return is_openai
 
 
 class ServiceUrlHandler(APIHandler):
     @tornado.web.authenticated
     def get(self):
-        self.finish(json.dumps({
-            "url": runtime_configs["service_url"],
-            "is_openai": runtime_configs["is_openai"]
+        config = runtime_configs
+        self.finish(_dumps({
+            "url": config.service_url,
+            "is_openai": config.is_openai
             }))
 
     @tornado.web.authenticated
-    def post(self):
+    async def post(self):
+        # The probe below is authenticated with the current token
+        _ensure_token()
         json_payload = self.get_json_body()
 
-        runtime_configs["service_url"] = json_payload["url"]
-
-        try:
-            r = requests.get(url_path_join(runtime_configs["service_url"]), headers=get_header())
-            runtime_configs["is_openai"] = (r.json()["name"] != "qiskit-code-assistant")
-        except (requests.exceptions.JSONDecodeError, KeyError):
-            runtime_configs["is_openai"] = True
-        finally:
-            self.finish(json.dumps({
-                "url": runtime_configs["service_url"],
-                "is_openai": runtime_configs["is_openai"]
-                }))
+        service_url = json_payload["url"]
+        probed = _PROBE_RESULTS.get(service_url)
+        if probed is not None and time.monotonic() - probed[0] < PROBE_CACHE_TTL:
+            # The service type is known from a recent probe
+            is_openai = probed[1]
+        else:
+            is_openai = await _probe_is_openai(service_url)
+            if is_openai is None:
+                # Unreachable service: keep the current is_openai value
+                is_openai = runtime_configs.is_openai
+
+        # Publish the URL and its service type together, and only if they changed
+        config = runtime_configs
+        if (config.service_url, config.is_openai) != (service_url, is_openai):
+            _atomic_swap(service_url=service_url, is_openai=is_openai)
+            clear_response_cache()
+            _join.cache_clear()
+
+        config = runtime_configs
+        self.finish(_dumps({
+            "url": config.service_url,
+            "is_openai": config.is_openai
+            }))
 
 
 class TokenHandler(APIHandler):
     @tornado.web.authenticated
     def get(self):
-        self.finish(json.dumps({"success": (runtime_configs["api_token"] != ""
-                                            or runtime_configs["is_openai"])}))
+        _ensure_token()
+        config = runtime_configs
+        self.finish(_dumps({"success": (config.api_token != ""
+                                        or config.is_openai)}))
 
     @tornado.web.authenticated
     def post(self):
         json_payload = self.get_json_body()
 
+        _ensure_token()
         update_token(json_payload["token"])
+        clear_response_cache()
 
-        self.finish(json.dumps({"success": "true"}))
+        self.finish(_SUCCESS_TRUE)
 
 
-class ModelsHandler(APIHandler):
-    @tornado.web.authenticated
-    def get(self):
-        if runtime_configs["is_openai"]:
-            url = url_path_join(runtime_configs["service_url"], OPENAI_VERSION, "models")
-        else:
-            url = url_path_join(runtime_configs["service_url"], QCA_API_VERSION, "models")
+def transform_models_response(response, config):
+    return {"models": [transform_model(model, config.is_openai) for model in response["data"]]}
 
-        models = []
-        try:
-            r = requests.get(url, headers=get_header())
-            r.raise_for_status()
 
-            if r.ok:
-                data = r.json()["data"]
-                models = list(map(transform_model, data, [runtime_configs["is_openai"] * len(data)]))
-        except requests.exceptions.HTTPError as err:
-            self.set_status(err.response.status_code)
-            self.finish(json.dumps(err.response.json()))
-        else:
-            self.finish(json.dumps({"models": models}))
+def transform_model_response(response, config):
+    return transform_model(response, config.is_openai)
 
 
-class ModelHandler(APIHandler):
-    @tornado.web.authenticated
-    def get(self, id):
-        if runtime_configs["is_openai"]:
-            url = url_path_join(runtime_configs["service_url"], OPENAI_VERSION, "models", id)
-        else:
-            url = url_path_join(runtime_configs["service_url"], QCA_API_VERSION, "models", id)
+def to_acceptance_request(request_body, id):
+    return {
+        "completion": id,
+        "accepted": request_body["accepted"]
+    }
 
-        model = {}
-        try:
-            r = requests.get(url, headers=get_header())
-            r.raise_for_status()
 
-            if r.ok:
-                model = transform_model(r.json(), runtime_configs["is_openai"])
-        except requests.exceptions.HTTPError as err:
-            self.set_status(err.response.status_code)
-            self.finish(json.dumps(err.response.json()))
-        else:
-            self.finish(json.dumps(model))
+@dataclass(frozen=True)
+class Route:
+    """How one endpoint maps onto the upstream service.
 
+    Paths are tuples of URL segments joined onto the service URL, with "{id}"
+    replaced by the id captured from the request path. When the service is
+    OpenAI-compatible, either openai_only_response is returned as-is or the
+    request goes to openai_path.
+    """
+    native_path: tuple
+    openai_path: Optional[tuple] = None
+    method: str = "GET"
+    transformer: Optional[Callable] = None  # (upstream json, config) -> response
+    openai_only_response: Optional[bytes] = None
+    request_transformer: Optional[Callable] = None  # (request json, id) -> upstream json
+    cache_kind: Optional[str] = None
+    cache_ttl: float = MODELS_CACHE_TTL  # 0 always revalidates with the upstream
+    invalidates: Optional[str] = None  # cache kind dropped after a successful call
+
+
+MODELS_ROUTE = Route(
+    native_path=(QCA_API_VERSION, "models"),
+    openai_path=(OPENAI_VERSION, "models"),
+    transformer=transform_models_response,
+    cache_kind="models",
+)
+MODEL_ROUTE = Route(
+    native_path=(QCA_API_VERSION, "models", "{id}"),
+    openai_path=(OPENAI_VERSION, "models", "{id}"),
+    transformer=transform_model_response,
+    cache_kind="model",
+)
+# The acceptance state can change at any time, so always revalidate
+DISCLAIMER_ROUTE = Route(
+    native_path=(QCA_API_VERSION, "models", "{id}", "disclaimer"),
+    openai_only_response=_ACCEPTED_TRUE,
+    cache_kind="disclaimer",
+    cache_ttl=0,
+)
+DISCLAIMER_ACCEPTANCE_ROUTE = Route(
+    native_path=(QCA_API_VERSION, "models", "{id}", "disclaimer"),
+    method="POST",
+    openai_only_response=_SUCCESS_TRUE,
+    invalidates="disclaimer",
+)
+PROMPT_ACCEPTANCE_ROUTE = Route(
+    native_path=(QCA_API_VERSION, "completion", "acceptance"),
+    method="POST",
+    openai_only_response=_SUCCESS_TRUE,
+    request_transformer=to_acceptance_request,
+)
+FEEDBACK_ROUTE = Route(
+    native_path=("feedback",),
+    method="POST",
+    openai_only_response=_FEEDBACK_UNSUPPORTED,
+)
+
+
+class ProxyHandler(APIHandler):
+    """Forwards requests to the upstream service as described by a Route per HTTP method."""
+
+    def initialize(self, routes):
+        self.routes = routes
 
-class DisclaimerHandler(APIHandler):
     @tornado.web.authenticated
-    def get(self, id):
-        if runtime_configs["is_openai"]:
-            self.finish(json.dumps({"accepted": "true"}))
-        else:
-            url = url_path_join(runtime_configs["service_url"], QCA_API_VERSION, "models", id, "disclaimer")
+    @validate_id
+    async def get(self, id=None):
+        await self._proxy("GET", id)
 
-            try:
-                r = requests.get(url, headers=get_header())
-                r.raise_for_status()
-            except requests.exceptions.HTTPError as err:
-                self.set_status(err.response.status_code)
-                self.finish(json.dumps(err.response.json()))
+    @tornado.web.authenticated
+    @validate_id
+    async def post(self, id=None):
+        await self._proxy("POST", id)
+
+    async def _proxy(self, method, id):
+        route = self.routes.get(method)
+        if route is None:
+            raise tornado.web.HTTPError(405)
+
+        _ensure_token()
+        config = runtime_configs
+        if config.is_openai and route.openai_only_response is not None:
+            self.finish(route.openai_only_response)
+            return
+
+        cache_key = None
+        cached_entry = None
+        headers = get_header(config)
+        if route.cache_kind is not None:
+            cache_key = response_cache_key(config, route.cache_kind, id)
+            cached = get_fresh_cached_response(cache_key, route.cache_ttl)
+            if cached is not None:
+                self.finish(cached)
+                return
+            headers, cached_entry = get_conditional_header(config, cache_key)
+
+        path = route.openai_path if config.is_openai else route.native_path
+        url = _join(config.service_url, *(id if part == "{id}" else part for part in path))
+
+        request_body = None
+        if method == "POST":
+            request_body = self.get_json_body()
+            if route.request_transformer is not None:
+                request_body = route.request_transformer(request_body, id)
+
+        try:
+            if method == "GET":
+                r = await _coalesced_get(url, headers)
             else:
-                self.finish(json.dumps(r.json()))
+                r = await _request(method, url, headers=headers, json=request_body)
+            r.raise_for_status()
+        except requests.exceptions.HTTPError as err:
+            self.set_status(err.response.status_code)
+            self.finish(upstream_error_body(err.response))
+            return
 
-    @tornado.web.authenticated
-    def post(self, id):
-        if runtime_configs["is_openai"]:
-            self.finish(json.dumps({"success": "true"}))
+        if r.status_code == 304 and cached_entry is not None:
+            body = revalidate_cached_response(cache_key, cached_entry)
         else:
-            url = url_path_join(runtime_configs["service_url"], QCA_API_VERSION, "models", id, "disclaimer")
+            body = r.content
+            if route.transformer is not None:
+                body = _dumps(route.transformer(_loads(body), config))
+            if cache_key is not None:
+                store_cached_response(cache_key, body, r.headers)
 
-            try:
-                r = requests.post(url, headers=get_header(), json=self.get_json_body())
-                r.raise_for_status()
-            except requests.exceptions.HTTPError as err:
-                self.set_status(err.response.status_code)
-                self.finish(json.dumps(err.response.json()))
-            else:
-                self.finish(json.dumps(r.json()))
+        if route.invalidates is not None:
+            _RESPONSE_CACHE.pop(response_cache_key(config, route.invalidates, id), None)
+        self.finish(body)
 
 
 class PromptHandler(APIHandler):
+    def initialize(self):
+        # Upstream chunks are not line-aligned, so a trailing partial line is
+        # held back until the rest of it arrives
+        self._sse_buffer = bytearray()
+        # Pending timer that flushes events written since the last flush
+        self._flush_handle = None
+
+    def _schedule_flush(self):
+        """Flush after STREAM_FLUSH_DELAY, so events from bursts of chunks share a socket write."""
+        if self._flush_handle is None:
+            self._flush_handle = IOLoop.current().call_later(STREAM_FLUSH_DELAY, self._flush_events)
+
+    def _flush_events(self):
+        self._flush_handle = None
+        if not self._finished:
+            self.flush()
+
+    def on_finish(self):
+        # finish() already flushed everything, so drop any pending timer
+        if self._flush_handle is not None:
+            IOLoop.current().remove_timeout(self._flush_handle)
+            self._flush_handle = None
+
     @tornado.web.authenticated
-    @tornado.gen.coroutine
-    def post(self, id):
+    @validate_id
+    async def post(self, id):
+        _ensure_token()
+        config = runtime_configs
         request_body = self.get_json_body()
         is_stream = request_body.get("stream", False)
-        is_openai = runtime_configs.get("is_openai", False)
+        is_openai = config.is_openai
 
         if is_openai:
-            url = url_path_join(runtime_configs["service_url"], OPENAI_VERSION, "completions")
+            url = _join(config.service_url, OPENAI_VERSION, "completions")
             request_body = {
                 "model": id,
                 "prompt": request_body["input"],
                 "stream": is_stream
             }
         else:
-            url = url_path_join(runtime_configs["service_url"], QCA_API_VERSION, "chat", "completions")
+            url = _join(config.service_url, QCA_API_VERSION, "chat", "completions")
             request_body = {
                 "model": id,
                 "messages": [
@@ -383,145 +908,141 @@ class PromptHandler(APIHandler):
                 "stream": is_stream
             }
 
-        def _on_chunk(chunk: bytes):
+        def _write_events(lines: bytes):
             try:
-                # Parse chunk - returns list of parsed SSE messages
-                parsed_chunks = parse_streaming_chunk(chunk)
+                # Parse complete lines - returns list of parsed SSE messages
+                parsed_chunks = parse_streaming_chunk(lines)
                 if parsed_chunks:  # Check if we got any valid parsed chunks
+                    out = []
                     for parsed_chunk in parsed_chunks:
                         # Convert each parsed chunk to our response format
                         response = to_model_prompt_response(parsed_chunk, is_openai, is_stream)
-                        self.write(STREAM_DATA_PREFIX + json.dumps(response) + "\n")
-                    self.flush()
+                        out.append(_STREAM_DATA_PREFIX_BYTES)
+                        out.append(_dumps(response))
+                        out.append(b"\n")
+                    # One write for all events of the upstream chunk
+                    self.write(b"".join(out))
+                    self._schedule_flush()
             except Exception as e:
                 # Log error but continue streaming
-                print(f"Error processing chunk: {e}")
+                logger.warning("Error processing chunk: %s", e)
                 # Send error to client
                 error_msg = {"error": str(e), "type": "chunk_processing_error"}
-                self.write(STREAM_DATA_PREFIX + json.dumps(error_msg) + "\n")
-                self.flush()
+                self.write(_STREAM_DATA_PREFIX_BYTES + _dumps(error_msg) + b"\n")
+                self._schedule_flush()
+
+        def _on_chunk(chunk: bytes):
+            self._sse_buffer += chunk
+            end = self._sse_buffer.rfind(b"\n") + 1
+            if end:
+                lines = bytes(self._sse_buffer[:end])
+                del self._sse_buffer[:end]
+                _write_events(lines)
 
         try:
             if is_stream:
-                yield make_streaming_request(url, json.dumps(request_body), _on_chunk)
+                set_event_stream_headers(self)
+                await make_streaming_request(url, _dumps(request_body), _on_chunk, config=config)
+                if self._sse_buffer:
+                    # The stream ended without a final newline
+                    _write_events(bytes(self._sse_buffer))
             else:
-                non_streaming_response = make_non_streaming_request(url, request_body)
+                non_streaming_response = await make_non_streaming_request(url, request_body, config=config)
                 result = to_model_prompt_response(non_streaming_response, is_openai, is_stream)
         except requests.exceptions.HTTPError as err:
             self.set_status(err.response.status_code)
-            try:
-                self.finish(json.dumps(err.response.json()))
-            except Exception:
-                self.finish(json.dumps({"error": "Request failed", "status": err.response.status_code}))
+            self.finish(upstream_error_body(err.response))
+        except tornado.web.HTTPError:
+            # Let Jupyter render its own error response (e.g. circuit breaker 503)
+            raise
         except Exception as e:
             # Handle other errors (timeouts, connection errors, etc.)
-            print(f"Error in prompt handler: {e}")
+            logger.exception("Error in prompt handler: %s", e)
             self.set_status(500)
-            self.finish(json.dumps({"error": str(e), "type": "server_error"}))
+            self.finish(_dumps({"error": str(e), "type": "server_error"}))
         else:
             if is_stream:
-                self.finish()
+                # Keep the SSE content type if nothing was flushed yet
+                self.finish(set_content_type="text/event-stream")
             else:
-                self.finish(json.dumps(result))
+                self.finish(_dumps(result))
 
 
-class PromptAcceptanceHandler(APIHandler):
-    @tornado.web.authenticated
-    def post(self, id):
-        if runtime_configs["is_openai"]:
-            self.finish(json.dumps({"success": "true"}))
-        else:
-            url = url_path_join(runtime_configs["service_url"], QCA_API_VERSION, "completion", "acceptance")
-            request_body = self.get_json_body()
-            request_body = {
-                "completion": id,
-                "accepted": request_body["accepted"]
-            }
-
-            try:
-                r = requests.post(url, headers=get_header(), json=request_body)
-                r.raise_for_status()
-            except requests.exceptions.HTTPError as err:
-                self.set_status(err.response.status_code)
-                self.finish(json.dumps(err.response.json()))
-            else:
-                self.finish(json.dumps(r.json()))
-
-
-class FeedbackHandler(APIHandler):
-    @tornado.web.authenticated
-    def post(self):
-        if runtime_configs["is_openai"]:
-            self.finish(json.dumps({"message": "Feedback not supported for this service"}))
-        else:
-            url = url_path_join(runtime_configs["service_url"], "feedback")
-
-            try:
-                r = requests.post(url, headers=get_header(), json=self.get_json_body())
-                r.raise_for_status()
-            except requests.exceptions.HTTPError as err:
-                self.set_status(err.response.status_code)
-                self.finish(json.dumps(err.response.json()))
-            else:
-                self.finish(json.dumps(r.json()))
+# Last GET /credentials body and the objects it was built from
+_CREDENTIALS_RESPONSE = {"config": None, "credentials": None, "prefs": None, "body": b""}
 
 
 class CredentialsHandler(APIHandler):
     @tornado.web.authenticated
     def get(self):
         """Get list of available credentials from qiskit-ibm.json"""
+        _ensure_token()
+        config = runtime_configs
         credentials = get_credentials_from_config()
+        prefs = load_preferences()
+
+        # The inputs are replaced rather than mutated whenever they change, so
+        # the last response can be reused while they are the same objects
+        cached = _CREDENTIALS_RESPONSE
+        if (cached["config"] is config
+                and cached["credentials"] is credentials
+                and cached["prefs"] is prefs):
+            self.finish(cached["body"])
+            return
 
         # Return credential names and selected credential
         credential_list = [
             {
                 "name": name,
-                "is_selected": name == runtime_configs["selected_credential"]
+                "is_selected": name == config.selected_credential
             }
             for name in credentials.keys()
         ]
 
-        self.finish(json.dumps({
+        body = _dumps({
             "credentials": credential_list,
-            "selected_credential": runtime_configs["selected_credential"],
-            "using_env_var": runtime_configs.get("using_env_var", False),
-            "never_prompt": get_never_prompt_flag(),
-            "has_prompted": get_has_prompted_flag()
-        }))
+            "selected_credential": config.selected_credential,
+            "using_env_var": config.using_env_var,
+            "never_prompt": get_never_prompt_flag(prefs),
+            "has_prompted": get_has_prompted_flag(prefs)
+        })
+        _CREDENTIALS_RESPONSE.update(config=config, credentials=credentials, prefs=prefs, body=body)
+        self.finish(body)
 
     @tornado.web.authenticated
     def post(self):
         """Select a credential to use"""
+        _ensure_token()
         json_payload = self.get_json_body()
         credential_name = json_payload.get("credential_name")
 
         if not credential_name:
             self.set_status(400)
-            self.finish(json.dumps({"error": "credential_name is required"}))
+            self.finish(_dumps({"error": "credential_name is required"}))
             return
 
         credentials = get_credentials_from_config()
 
         if credential_name not in credentials:
             self.set_status(404)
-            self.finish(json.dumps({"error": f"Credential '{credential_name}' not found"}))
+            self.finish(_dumps({"error": f"Credential '{credential_name}' not found"}))
             return
 
         # Validate that the credential has a token
         token = credentials[credential_name].get("token")
         if not token:
             self.set_status(400)
-            self.finish(json.dumps({"error": f"Credential '{credential_name}' has no token"}))
+            self.finish(_dumps({"error": f"Credential '{credential_name}' has no token"}))
             return
 
         # Set the selected credential and update token
-        runtime_configs["selected_credential"] = credential_name
-        runtime_configs["api_token"] = token
+        _atomic_swap(selected_credential=credential_name, api_token=token)
+        clear_response_cache()
 
         # Save selection to preference file for persistence
         save_selected_credential(credential_name)
 
-        self.finish(json.dumps({
+        self.finish(_dumps({
             "success": True,
             "selected_credential": credential_name
         }))
@@ -531,6 +1052,7 @@ class CredentialsHandler(APIHandler):
         """Update credential state flags (never_prompt, has_prompted)"""
         json_payload = self.get_json_body()
 
+        # Preference writes are batched, so setting both flags writes the file once
         updates = {}
         if "never_prompt" in json_payload:
             set_never_prompt_flag(json_payload["never_prompt"])
@@ -542,10 +1064,10 @@ class CredentialsHandler(APIHandler):
 
         if not updates:
             self.set_status(400)
-            self.finish(json.dumps({"error": "No valid fields to update"}))
+            self.finish(_dumps({"error": "No valid fields to update"}))
             return
 
-        self.finish(json.dumps({
+        self.finish(_dumps({
             "success": True,
             "updated": updates
         }))
@@ -553,25 +1075,29 @@ class CredentialsHandler(APIHandler):
     @tornado.web.authenticated
     def delete(self):
         """Clear the credential selection and all state flags (reset to default behavior)"""
-        # Clear the runtime selection
-        runtime_configs["selected_credential"] = None
+        _ensure_token()
+        # Clear the runtime selection and any preference writes still queued
+        _atomic_swap(selected_credential=None)
+        discard_pending_preferences()
 
         # Delete the preference file (clears ALL state)
         pref_file = get_preference_file_path()
-        if os.path.exists(pref_file):
-            try:
-                os.remove(pref_file)
-                print("Cleared all credential preferences and state flags")
-            except IOError as e:
-                print(f"Error deleting preference file: {e}")
-                self.set_status(500)
-                self.finish(json.dumps({"error": f"Failed to delete preference file: {e}"}))
-                return
+        try:
+            os.remove(pref_file)
+            logger.info("Cleared all credential preferences and state flags")
+        except FileNotFoundError:
+            pass
+        except IOError as e:
+            logger.error("Error deleting preference file: %s", e)
+            self.set_status(500)
+            self.finish(_dumps({"error": f"Failed to delete preference file: {e}"}))
+            return
 
         # Re-initialize token to use default selection logic
         init_token()
+        clear_response_cache()
 
-        self.finish(json.dumps({
+        self.finish(_dumps({
             "success": True,
             "message": "Credential selection and all preferences have been reset. You'll be prompted again on next restart if multiple credentials exist."
         }))
@@ -579,11 +1105,12 @@ class CredentialsHandler(APIHandler):
 
 class MigrationHandler(APIHandler):
     @tornado.web.authenticated
-    @tornado.gen.coroutine
-    def post(self):
+    async def post(self):
+        _ensure_token()
+        config = runtime_configs
         request_body = self.get_json_body()
         is_stream = request_body.get("stream", False)
-        url = url_path_join(runtime_configs["service_url"], "migrate")
+        url = _join(config.service_url, "migrate")
 
         def _on_chunk(chunk: bytes):
             self.write(chunk)
@@ -591,70 +1118,121 @@ class MigrationHandler(APIHandler):
 
         try:
             if is_stream:
-                yield make_streaming_request(url, json.dumps(request_body), _on_chunk)
+                set_event_stream_headers(self)
+                await make_streaming_request(url, _dumps(request_body), _on_chunk, config=config)
             else:
-                result = make_non_streaming_request(url, request_body)
+                # The upstream response is forwarded as-is
+                result = await make_non_streaming_request_raw(url, request_body, config=config)
         except requests.exceptions.HTTPError as err:
             self.set_status(err.response.status_code)
-            try:
-                self.finish(json.dumps(err.response.json()))
-            except Exception:
-                self.finish(json.dumps({"error": "Request failed", "status": err.response.status_code}))
+            self.finish(upstream_error_body(err.response))
+        except tornado.web.HTTPError:
+            # Let Jupyter render its own error response (e.g. circuit breaker 503)
+            raise
         except Exception as e:
             # Handle other errors (timeouts, connection errors, etc.)
-            print(f"Error in prompt handler: {e}")
+            logger.exception("Error in migration handler: %s", e)
             self.set_status(500)
-            self.finish(json.dumps({"error": str(e), "type": "server_error"}))
+            self.finish(_dumps({"error": str(e), "type": "server_error"}))
         else:
             if is_stream:
-                self.finish()
+                # Keep the SSE content type if nothing was flushed yet
+                self.finish(set_content_type="text/event-stream")
             else:
-                self.finish(json.dumps(result))
+                self.finish(result)
+
+
+_ID_REGEX = r"(?P<id>[\w\-.:]+)"  # valid chars: alphanum | "-" | "_" | "." | ":"
+
+_ROUTES = (
+    ("/service", ServiceUrlHandler),
+    ("/token", TokenHandler),
+    ("/credentials", CredentialsHandler),
+    ("/models", ProxyHandler, {"routes": {"GET": MODELS_ROUTE}}),
+    ("/models/{id}", ProxyHandler, {"routes": {"GET": MODEL_ROUTE}}),
+    ("/models/{id}/disclaimer", ProxyHandler, {"routes": {
+        "GET": DISCLAIMER_ROUTE,
+        "POST": DISCLAIMER_ACCEPTANCE_ROUTE,
+    }}),
+    ("/model/{id}/prompt", PromptHandler),
+    ("/prompt/{id}/acceptance", ProxyHandler, {"routes": {"POST": PROMPT_ACCEPTANCE_ROUTE}}),
+    ("/feedback", ProxyHandler, {"routes": {"POST": FEEDBACK_ROUTE}}),
+    ("/migrate", MigrationHandler),
+)
 
 
 def setup_handlers(web_app):
     host_pattern = ".*$"
-    id_regex = r"(?P<id>[\w\-\_\.\:]+)"  # valid chars: alphanum | "-" | "_" | "." | ":"
     base_url = url_path_join(web_app.settings["base_url"], "qiskit-code-assistant")
 
-    handlers = [
-        (f"{base_url}/service", ServiceUrlHandler),
-        (f"{base_url}/token", TokenHandler),
-        (f"{base_url}/credentials", CredentialsHandler),
-        (f"{base_url}/models", ModelsHandler),
-        (f"{base_url}/models/{id_regex}", ModelHandler),
-        (f"{base_url}/models/{id_regex}/disclaimer", DisclaimerHandler),
-        (f"{base_url}/model/{id_regex}/prompt", PromptHandler),
-        (f"{base_url}/prompt/{id_regex}/acceptance", PromptAcceptanceHandler),
-        (f"{base_url}/feedback", FeedbackHandler),
-        (f"{base_url}/migrate", MigrationHandler),
-    ]
+    handlers = [(f"{base_url}{path.format(id=_ID_REGEX)}", *spec) for path, *spec in _ROUTES]
     web_app.add_handlers(host_pattern, handlers)
-    init_token()
 
 
-def make_non_streaming_request(url: str, json_body: dict, method: str = "POST"):
-    r = requests.request(
+async def make_non_streaming_request(
+    url: str, json_body: dict, method: str = "POST", config: Optional[RuntimeConfig] = None
+):
+    return _loads(await make_non_streaming_request_raw(url, json_body, method, config))
+
+
+async def make_non_streaming_request_raw(
+    url: str, json_body: dict, method: str = "POST", config: Optional[RuntimeConfig] = None
+) -> bytes:
+    """Like make_non_streaming_request, but return the upstream body without parsing it."""
+    r = await _request(
         method,
         url,
-        headers=get_header(),
-        json=json_body
+        headers=get_header(config),
+        json=json_body,
+        timeout=GENERATION_TIMEOUT
     )
     r.raise_for_status()
+    return r.content
+
+
+def set_event_stream_headers(handler: APIHandler):
+    """Send chunks as server-sent events so they are not buffered on the way to the browser."""
+    handler.set_header("Content-Type", "text/event-stream")
+    handler.set_header("Cache-Control", "no-cache")
+    handler.set_header("X-Accel-Buffering", "no")
+
+
+# Client for streaming requests, created on first use
+_STREAMING_CLIENT = {"client": None}
+STREAMING_MAX_CLIENTS = 32
 
-    if r.ok:
-        return r.json()
-    return {}
+
+def _get_streaming_client():
+    """Return the client used for streaming requests.
+
+    Uses libcurl when pycurl is installed, for its connection reuse. The client is
+    created directly rather than through AsyncHTTPClient.configure(), so other
+    Jupyter server code keeps the default implementation.
+    """
+    client = _STREAMING_CLIENT["client"]
+    if client is None:
+        try:
+            from tornado.curl_httpclient import CurlAsyncHTTPClient
+        except ImportError:
+            client = tornado.httpclient.AsyncHTTPClient()
+        else:
+            client = CurlAsyncHTTPClient(force_instance=True, max_clients=STREAMING_MAX_CLIENTS)
+        _STREAMING_CLIENT["client"] = client
+    return client
 
 
 def make_streaming_request(
-    url: str, request_body: str, streaming_callback: Callable, method: str = "POST"
+    url: str,
+    request_body: bytes,
+    streaming_callback: Callable,
+    method: str = "POST",
+    config: Optional[RuntimeConfig] = None,
 ) -> tornado.concurrent.Future:
-    client = tornado.httpclient.AsyncHTTPClient()
+    client = _get_streaming_client()
     request = tornado.httpclient.HTTPRequest(
         url,
         method=method,
-        headers=get_header(),
+        headers=get_header(config),
         body=request_body,
         streaming_callback=streaming_callback,
         request_timeout=60.0,  # 60 second timeout for streaming requests
@@ -663,24 +1241,33 @@ def make_streaming_request(
     return client.fetch(request, raise_error=True)
 
 
+@functools.lru_cache(maxsize=256)
+def format_created_at(created) -> str:
+    """Format a unix timestamp as ISO 8601 in UTC, independent of the server's local timezone.
+
+    Memoized because every event of a streamed completion carries the same timestamp.
+    """
+    return datetime.fromtimestamp(int(created), tz=_UTC).isoformat()
+
+
 def to_model_prompt_response(response: dict, is_openai: bool, is_stream: bool) -> dict:
     if not response:
         return {}
     if is_openai:
         return {
-            "results": list(map(lambda c: {"generated_text": c["text"]}, response["choices"])),
+            "results": [{"generated_text": c["text"]} for c in response["choices"]],
             "prompt_id": response["id"],
-            "created_at": datetime.fromtimestamp(int(response["created"])).isoformat()
+            "created_at": format_created_at(response["created"])
         }
     else:
+        content_key = "delta" if is_stream else "message"
         return {
-            "results": list(map(lambda c: {"generated_text": c["delta" if is_stream else "message"]["content"]}, response["choices"])),
+            "results": [{"generated_text": c[content_key]["content"]} for c in response["choices"]],
             "prompt_id": response["id"],
-            "created_at": datetime.fromtimestamp(int(response["created"])).isoformat()
+            "created_at": format_created_at(response["created"])
         }
 
 
-
 def parse_streaming_chunk(chunk: bytes) -> list:
     """
     Parse OpenAI/Ollama SSE streaming chunks.
@@ -688,30 +1275,22 @@ def parse_streaming_chunk(chunk: bytes) -> list:
     Handles 'data: [DONE]' termination marker.
     """
     results = []
-    try:
-        chunk_str = chunk.decode("utf-8")
-        # Split by newlines to handle multiple SSE messages in one chunk
-        lines = chunk_str.strip().split('\n')
-
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            # Check for [DONE] marker
-            if line == "data: [DONE]":
-                continue
-
-            # Parse SSE format: "data: {json}"
-            if line.startswith(STREAM_DATA_PREFIX):
-                json_str = line[len(STREAM_DATA_PREFIX):].strip()
-                if json_str and json_str != "[DONE]":
-                    try:
-                        data = json.loads(json_str)
-                        results.append(data)
-                    except json.JSONDecodeError as e:
-                        print(f"Error parsing JSON in line: {line[:100]}... Error: {e}")
-    except UnicodeDecodeError as e:
-        print(f"Error decoding chunk: {e}")
+    # Split by newlines to handle multiple SSE messages in one chunk
+    for line in chunk.split(b"\n"):
+        line = line.strip()
+
+        # Parse SSE format: "data: {json}"
+        if not line.startswith(_STREAM_DATA_PREFIX_BYTES):
+            continue
+
+        # The line is already stripped, and JSON allows the leading whitespace
+        payload = line[_STREAM_DATA_PREFIX_LEN:]
+        # Skip empty payloads and the [DONE] marker
+        if payload and payload != _STREAM_DONE_PAYLOAD:
+            try:
+                results.append(_loads(payload))
+            except ValueError as e:
+                # Covers JSON errors and payloads that are not valid UTF-8
+                logger.debug("Error parsing JSON in line: %r... Error: %s", line[:100], e)
 
     return results
@@ -0,0 +1,189 @@
+#
+# Copyright 2024 IBM Corporation
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import asyncio
+import inspect
+import json
+from unittest import mock
+
+import pytest
+import requests
+import tornado.web
+from tornado.httputil import HTTPHeaders, HTTPServerRequest
+from tornado.ioloop import IOLoop
+
+from qiskit_code_assistant_jupyterlab import handlers
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(tmp_path, monkeypatch):
+    """Point the preference and credential files at tmp_path and reset module caches."""
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.delenv("QISKIT_IBM_TOKEN", raising=False)
+    monkeypatch.setattr(handlers, "runtime_configs", handlers.RuntimeConfig(api_token="token"))
+    monkeypatch.setattr(handlers, "_token_initialized", True)
+    handlers._RESPONSE_CACHE.clear()
+    handlers._INFLIGHT.clear()
+    handlers._PENDING_PREFS.clear()
+    handlers._PREFS_CACHE.update(mtime=None, prefs={})
+    handlers._PREFS_FLUSH["handle"] = None
+    yield
+    handlers._RESPONSE_CACHE.clear()
+    handlers._PENDING_PREFS.clear()
+    handlers._PREFS_FLUSH["handle"] = None
+
+
+def make_handler(cls, method="GET", body=b"", **kwargs):
+    """Build a handler for a request that is never sent over a connection."""
+    request = HTTPServerRequest(
+        method=method,
+        uri="/",
+        body=body,
+        headers=HTTPHeaders({"Content-Type": "application/json"}),
+        connection=mock.Mock(),
+    )
+    handler = cls(tornado.web.Application(), request, **kwargs)
+    handler.flush = mock.Mock()
+    handler.finish = mock.Mock()
+    return handler
+
+
+def call(handler, name, *args):
+    """Call a handler method without the authentication and id checks."""
+    result = inspect.unwrap(getattr(type(handler), name))(handler, *args)
+    if inspect.isawaitable(result):
+        return asyncio.run(result)
+    return result
+
+
+def make_response(status_code, content=b"", headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = content
+    response.headers.update(headers or {})
+    return response
+
+
+def sse_event(text):
+    return b'data: {"id": "p1", "created": 0, "choices": [{"delta": {"content": "%s"}}]}' % text
+
+
+def test_parse_streaming_chunk_skips_done_and_partial_lines():
+    chunk = sse_event(b"a") + b"\n\n" + b"data: [DONE]\n" + b'data: {"id": '
+    assert [c["choices"][0]["delta"]["content"] for c in handlers.parse_streaming_chunk(chunk)] == ["a"]
+
+
+def test_prompt_stream_joins_lines_split_across_chunks(monkeypatch):
+    first, second = sse_event(b"Hello"), sse_event(b"world")
+    chunks = [first[:20], first[20:] + b"\n\n" + second[:10], second[10:]]
+
+    async def fake_streaming_request(url, body, on_chunk, config=None):
+        for chunk in chunks:
+            on_chunk(chunk)
+
+    monkeypatch.setattr(handlers, "make_streaming_request", fake_streaming_request)
+    handler = make_handler(handlers.PromptHandler, "POST", b'{"input": "q", "stream": true}')
+    written = []
+    handler.write = written.append
+
+    call(handler, "post", "model")
+
+    events = [json.loads(line[len(b"data: "):]) for line in b"".join(written).splitlines()]
+    assert [e["results"][0]["generated_text"] for e in events] == ["Hello", "world"]
+    handler.finish.assert_called_once_with(set_content_type="text/event-stream")
+
+
+def test_models_304_serves_the_cached_body(monkeypatch):
+    upstream = [
+        make_response(200, b'{"data": [{"id": "m"}]}', {"ETag": '"v1"'}),
+        make_response(304),
+    ]
+    requests_seen = []
+
+    async def fake_get(url, headers):
+        requests_seen.append(headers)
+        return upstream.pop(0)
+
+    monkeypatch.setattr(handlers, "_coalesced_get", fake_get)
+    routes = {"GET": handlers.MODELS_ROUTE}
+
+    first = make_handler(handlers.ProxyHandler, routes=routes)
+    call(first, "get")
+    body = first.finish.call_args[0][0]
+
+    # Expire the entry so the next request revalidates it
+    for entry in handlers._RESPONSE_CACHE.values():
+        entry["time"] -= handlers.MODELS_CACHE_TTL
+    second = make_handler(handlers.ProxyHandler, routes=routes)
+    call(second, "get")
+
+    assert requests_seen[1]["If-None-Match"] == '"v1"'
+    second.finish.assert_called_once_with(body)
+
+
+def test_revalidate_after_cache_clear_returns_body_without_restoring_entry():
+    config = handlers.runtime_configs
+    key = handlers.response_cache_key(config, "models")
+    handlers.store_cached_response(key, b"body", {"ETag": '"v1"'})
+    _, entry = handlers.get_conditional_header(config, key)
+
+    handlers.clear_response_cache()
+
+    assert handlers.revalidate_cached_response(key, entry) == b"body"
+    assert key not in handlers._RESPONSE_CACHE
+
+
+def test_concurrent_gets_share_one_upstream_call(monkeypatch):
+    calls = []
+
+    async def fake_request(method, url, **kwargs):
+        calls.append(url)
+        await asyncio.sleep(0.01)
+        return make_response(200, b"{}")
+
+    monkeypatch.setattr(handlers, "_request", fake_request)
+
+    async def run():
+        return await asyncio.gather(
+            handlers._coalesced_get("http://upstream/models", {"a": "1"}),
+            handlers._coalesced_get("http://upstream/models", {"a": "1"}),
+            handlers._coalesced_get("http://upstream/models", {"a": "2"}),
+        )
+
+    first, second, other = asyncio.run(run())
+    assert first is second and other is not first
+    assert len(calls) == 2
+    assert not handlers._INFLIGHT
+
+
+def test_delete_credentials_discards_queued_preferences():
+    pref_file = handlers.get_preference_file_path()
+    handler = make_handler(handlers.CredentialsHandler, "DELETE")
+
+    async def run():
+        # Create the IOLoop the preference writes are batched on, as in the server
+        IOLoop.current()
+        handlers.set_never_prompt_flag(True)
+        assert handlers.get_never_prompt_flag()
+        assert not pref_file.exists()
+        call(handler, "delete")
+        # Outlast the batching delay; nothing may be written afterwards
+        await asyncio.sleep(handlers.PREFS_FLUSH_DELAY * 2)
+
+    asyncio.run(run())
+
+    assert not pref_file.exists()
+    assert not handlers.get_never_prompt_flag()